@@ -6,6 +6,11 @@ from dwfconstants import *
 import time
 from ctypes import *
 
+# 깜빡임 주기 설정 (1 Hz, 듀티 50%)
+BLINK_FREQUENCY_HZ = 1.0
+# 패턴 발생기 카운터가 한 주기 동안 셀 틱 수 (절반은 LOW, 절반은 HIGH)
+COUNTS_PER_PERIOD = 1000
+
 # WaveForms SDK 라이브러리 로드
 dwf = cdll.dwf
 hdwf = c_int()
@@ -15,26 +20,30 @@ if dwf.FDwfDeviceOpen(c_int(-1), byref(hdwf)) == 0:
     print("Failed to open device")
     quit()
 
-# DIO-0 핀을 출력으로 활성화
-dwf.FDwfDigitalIOOutputEnableSet(hdwf, c_uint(0x01))  # bitmask: 0x01 = DIO-0
-dwf.FDwfDigitalIOConfigure(hdwf)
+# DIO-0 핀에 패턴 발생기(Digital Out)로 1 Hz 구형파를 출력합니다.
+# 토글 타이밍을 장치 클럭이 만들기 때문에 파이썬 sleep 지터가 없습니다.
+hz_system = c_double()
+dwf.FDwfDigitalOutInternalClockInfo(hdwf, byref(hz_system))
+
+dwf.FDwfDigitalOutEnableSet(hdwf, c_int(0), c_int(1))
+dwf.FDwfDigitalOutTypeSet(hdwf, c_int(0), DwfDigitalOutTypePulse)
+# 카운터 클럭 = 시스템 클럭 / divider = BLINK_FREQUENCY_HZ * COUNTS_PER_PERIOD
+dwf.FDwfDigitalOutDividerSet(hdwf, c_int(0), c_int(int(hz_system.value / (BLINK_FREQUENCY_HZ * COUNTS_PER_PERIOD))))
+dwf.FDwfDigitalOutCounterSet(hdwf, c_int(0), c_int(COUNTS_PER_PERIOD // 2), c_int(COUNTS_PER_PERIOD // 2))
+dwf.FDwfDigitalOutRunSet(hdwf, c_double(0)) # 0 = 무한 반복
+dwf.FDwfDigitalOutConfigure(hdwf, c_int(1))
 
 print("Blinking external LED on DIO-0... Press Ctrl+C to stop")
 
 try:
+    # 패턴은 장치가 계속 출력하므로 파이썬은 대기만 합니다.
     while True:
-        # LED ON
-        dwf.FDwfDigitalIOOutputSet(hdwf, c_uint(0x01))
-        dwf.FDwfDigitalIOConfigure(hdwf)
-        time.sleep(0.5)
-
-        # LED OFF
-        dwf.FDwfDigitalIOOutputSet(hdwf, c_uint(0x00))
-        dwf.FDwfDigitalIOConfigure(hdwf)
-        time.sleep(0.5)
+        time.sleep(1.0)
 
 except KeyboardInterrupt:
     print("Stopped by user")
 
-# 장치 닫기
+# 패턴 발생기 정지 후 장치 닫기
+dwf.FDwfDigitalOutConfigure(hdwf, c_int(0))
+dwf.FDwfDigitalOutReset(hdwf)
 dwf.FDwfDeviceClose(hdwf)
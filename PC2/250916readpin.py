@@ -3,6 +3,7 @@ import sys
 from pathlib import Path
 import time
 from ctypes import *
+import numpy as np
 
 try:
     sys.path.append(str(Path(__file__).resolve().parent))
@@ -10,6 +11,12 @@ try:
 except ImportError:
     print("dwfconstants.py not found. Make sure it's in the same directory or in the python path.")
     quit()
+
+try:
+    from dwf_session import dwf, open_device, wait_settled
+except ImportError:
+    print("dwf_session.py not found. Make sure it's in the same directory.")
+    quit()
 #endregion
 
 #region: ------------------------- Configuration ----------------------------
@@ -18,21 +25,9 @@ W1_VOLTAGE_TO_SET = 1.5
 
 # 몇 초 간격으로 값을 읽어올지 설정합니다.
 READ_INTERVAL_SECONDS = 0.5
-#endregion
 
-#region: ------------------------- DWF Library Setup ------------------------
-try:
-    if sys.platform.startswith("win"):
-        dwf = cdll.dwf
-    elif sys.platform.startswith("darwin"):
-        dwf = cdll.LoadLibrary("/Library/Frameworks/dwf.framework/dwf")
-    else:
-        dwf = cdll.LoadLibrary("libdwf.so")
-except OSError:
-    print("DWF library not found. Please install WaveForms.")
-    quit()
-
-hdwf = c_int()
+# 스코프가 연속 기록(Record 모드)할 샘플링 주파수 (Hz)
+RECORD_FREQUENCY_HZ = 1000.0
 #endregion
 
 #region: ------------------------- Main Logic -------------------------------
@@ -40,51 +35,67 @@ def read_voltages():
     """
     W1에 전압을 출력하고, 스코프 채널 1 (1+ vs 1-)의 전압을 지속적으로 읽어옵니다.
     """
-    print("Opening first device...")
-    if dwf.FDwfDeviceOpen(c_int(-1), byref(hdwf)) == 0:
-        print("Failed to open device")
-        return
-
     try:
-        # 1. W1 (파형 발생기) 설정: 설정된 DC 전압을 출력합니다.
-        print(f"Setting W1 output to {W1_VOLTAGE_TO_SET} V...")
-        dwf.FDwfAnalogOutNodeEnableSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_bool(True))
-        dwf.FDwfAnalogOutNodeFunctionSet(hdwf, c_int(0), AnalogOutNodeCarrier, funcDC)
-        dwf.FDwfAnalogOutNodeOffsetSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(W1_VOLTAGE_TO_SET))
-        dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(True))
-        time.sleep(0.5) # 전압 안정화 대기
+        with open_device() as hdwf:
+            try:
+                # 1. W1 (파형 발생기) 설정: 설정된 DC 전압을 출력합니다.
+                print(f"Setting W1 output to {W1_VOLTAGE_TO_SET} V...")
+                dwf.FDwfAnalogOutNodeEnableSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_bool(True))
+                dwf.FDwfAnalogOutNodeFunctionSet(hdwf, c_int(0), AnalogOutNodeCarrier, funcDC)
+                dwf.FDwfAnalogOutNodeOffsetSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(W1_VOLTAGE_TO_SET))
+                dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(True))
+
+                # 2. 스코프 채널 1 (1+, 1-) 설정
+                print("Configuring Scope Channel 1...")
+                dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(0), c_bool(True))
+                dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(0), c_double(5.0)) # +/- 5V 범위로 설정
+                # 장치가 연속으로 기록하고, 파이썬은 쌓인 샘플을 묶음으로 가져옵니다.
+                dwf.FDwfAnalogInAcquisitionModeSet(hdwf, acqmodeRecord)
+                dwf.FDwfAnalogInFrequencySet(hdwf, c_double(RECORD_FREQUENCY_HZ))
+                dwf.FDwfAnalogInRecordLengthSet(hdwf, c_double(0)) # 0 = 무제한 기록
+                dwf.FDwfAnalogInConfigure(hdwf, c_bool(False), c_bool(True))
+
+                # 고정 대기 대신 측정 전압이 안정될 때까지만 기다립니다.
+                if not wait_settled(hdwf):
+                    print(f"Warning: W1 = {W1_VOLTAGE_TO_SET}V did not settle within 0.5 s.")
+
+                print("\n--- Starting to read voltages ---")
+                print("Press Ctrl+C to stop.")
+
+                # 한 번의 읽기 간격 동안 쌓이는 샘플을 모두 담을 수 있는 버퍼
+                buffer_size = 2 * int(RECORD_FREQUENCY_HZ * READ_INTERVAL_SECONDS)
+                buffer = (c_double * buffer_size)()
+                samples = np.frombuffer(buffer, dtype=np.float64)
+                sts = c_byte()
+                c_available = c_int()
+                c_lost = c_int()
+                c_corrupted = c_int()
 
-        # 2. 스코프 채널 1 (1+, 1-) 설정
-        print("Configuring Scope Channel 1...")
-        dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(0), c_bool(True))
-        dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(0), c_double(5.0)) # +/- 5V 범위로 설정
-        dwf.FDwfAnalogInConfigure(hdwf, c_bool(False), c_bool(False))
-        time.sleep(0.5)
+                # 3. 무한 루프를 돌며 쌓인 샘플을 한 번에 읽고 출력
+                while True:
+                    time.sleep(READ_INTERVAL_SECONDS)
 
-        print("\n--- Starting to read voltages ---")
-        print("Press Ctrl+C to stop.")
+                    dwf.FDwfAnalogInStatus(hdwf, c_bool(True), byref(sts))
+                    dwf.FDwfAnalogInStatusRecord(hdwf, byref(c_available), byref(c_lost), byref(c_corrupted))
+                    if c_lost.value or c_corrupted.value:
+                        print("\nSamples were lost or corrupted! Reduce RECORD_FREQUENCY_HZ.")
 
-        # 3. 무한 루프를 돌며 값 읽기 및 출력
-        while True:
-            # 새로운 측정을 위해 상태 확인
-            dwf.FDwfAnalogInStatus(hdwf, c_bool(False), None) 
-            
-            # 스코프 채널 1의 샘플 값(차동 전압)을 저장할 변수
-            v_scope1 = c_double()
-            dwf.FDwfAnalogInStatusSample(hdwf, c_int(0), byref(v_scope1))
-            
-            # 터미널에 현재 값들을 출력 (\r을 이용해 한 줄에서 업데이트)
-            print(f"\rSet W1: {W1_VOLTAGE_TO_SET:.3f} V   |   Measured (1+ vs 1-): {v_scope1.value:.4f} V  ", end="")
-            
-            time.sleep(READ_INTERVAL_SECONDS)
+                    n_read = min(c_available.value, buffer_size)
+                    if n_read == 0:
+                        continue
+                    dwf.FDwfAnalogInStatusData(hdwf, c_int(0), buffer, c_int(n_read))
+                    chunk = samples[:n_read]
 
+                    # 터미널에 현재 값들을 출력 (\r을 이용해 한 줄에서 업데이트)
+                    print(f"\rSet W1: {W1_VOLTAGE_TO_SET:.3f} V   |   Measured (1+ vs 1-): {chunk[-1]:.4f} V"
+                          f"   (mean of {n_read}: {chunk.mean():.4f} V)  ", end="")
+            finally:
+                # 프로그램 종료 시 파형 발생기를 정지한 뒤 장치를 닫습니다.
+                dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(False))
+    except RuntimeError as e:
+        print(e)
     except KeyboardInterrupt:
-        print("\n\nMeasurement stopped by user.")
-    finally:
-        # 프로그램 종료 시 장치 리셋 및 연결 해제
-        dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(False)) # 파형 발생기 정지
-        dwf.FDwfDeviceCloseAll()
-        print("Device closed.")
+        print("\nMeasurement stopped by user.")
 
 if __name__ == '__main__':
     read_voltages()
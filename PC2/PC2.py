@@ -3,6 +3,7 @@ import sys
 from pathlib import Path
 import time
 from ctypes import *
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -12,6 +13,12 @@ try:
 except ImportError:
     print("dwfconstants.py not found. Make sure it's in the same directory.")
     quit()
+
+try:
+    from dwf_session import dwf, open_device, wait_settled
+except ImportError:
+    print("dwf_session.py not found. Make sure it's in the same directory.")
+    quit()
 #endregion
 
 #region: ------------------------- Configuration ----------------------------
@@ -23,78 +30,89 @@ W1_VOLTAGES = [3.3/8,3.3/4, 3.3/2, 3.3]
 
 # 각 전압 레벨당 측정할 횟수
 N_SAMPLES = 1000 # 시간을 줄이기 위해 샘플 수를 약간 조정했습니다.
-#endregion
 
-#region: ------------------------- DWF Library Setup ------------------------
-try:
-    if sys.platform.startswith("win"):
-        dwf = cdll.dwf
-    else:
-        dwf = cdll.LoadLibrary("libdwf.so")
-except OSError:
-    print("DWF library not found. Please install WaveForms.")
-    quit()
+# 스코프 샘플링 주파수 (Hz). 각 전압마다 N_SAMPLES 개를 한 번에 수집합니다.
+SAMPLING_FREQUENCY_HZ = 10000.0
 
-hdwf = c_int()
+# 히스토그램 구간(bin) 개수
+HIST_BINS = 64
 #endregion
 
 #region: ------------------------- Main Logic -------------------------------
+def acquire_vout(hdwf, vin, buffer):
+    """W1에 vin을 출력하고 스코프 채널 1에서 N_SAMPLES 개를 buffer에 한 번에 수집합니다."""
+    # 1. W1 (파형 발생기) 설정
+    dwf.FDwfAnalogOutNodeEnableSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_bool(True))
+    dwf.FDwfAnalogOutNodeFunctionSet(hdwf, c_int(0), AnalogOutNodeCarrier, funcDC)
+    dwf.FDwfAnalogOutNodeOffsetSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(vin))
+    dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(True))
+
+    # 2. 스코프 채널 1 (1+, 1-) 설정
+    dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(0), c_bool(True))
+    # 측정 범위를 입력 전압보다 약간 큰 값으로 설정
+    dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(0), c_double(vin + 1.0))
+    dwf.FDwfAnalogInAcquisitionModeSet(hdwf, acqmodeSingle)
+    dwf.FDwfAnalogInFrequencySet(hdwf, c_double(SAMPLING_FREQUENCY_HZ))
+    dwf.FDwfAnalogInBufferSizeSet(hdwf, c_int(N_SAMPLES))
+    dwf.FDwfAnalogInConfigure(hdwf, c_bool(False), c_bool(False))
+    # 고정 대기 대신 측정 전압이 안정될 때까지만 기다립니다.
+    if not wait_settled(hdwf):
+        print(f"Warning: Vin = {vin:.3f}V did not settle within 0.5 s.")
+
+    # 3. N개 샘플을 한 번에 수집
+    dwf.FDwfAnalogInConfigure(hdwf, c_bool(False), c_bool(True))
+    sts = c_byte()
+    while True:
+        dwf.FDwfAnalogInStatus(hdwf, c_bool(True), byref(sts))
+        if sts.value == stsDone.value:
+            break
+        time.sleep(0.01)
+    dwf.FDwfAnalogInStatusData(hdwf, c_int(0), buffer, N_SAMPLES)
+
+def compute_resistances(vin, v_out):
+    """유효한 샘플(0 < Vout < Vin)에 대해 저항 값을 한 번에 계산합니다."""
+    valid = (v_out > 0) & (v_out < vin)
+    return R_REF * v_out[valid] / (vin - v_out[valid])
+
 def measure_resistance_for_all_voltages():
     """
     여러 W1 전압에 대해 저항 값을 측정하고 결과를 하나의 딕셔너리로 반환합니다.
+    다음 전압을 수집하는 동안 이전 전압의 저항 계산을 별도 스레드에서 처리합니다.
     """
-    print("Opening first device...")
-    if dwf.FDwfDeviceOpen(c_int(-1), byref(hdwf)) == 0:
-        print("Failed to open device")
-        return None
-
-    # <<< 수정된 부분: 모든 측정 결과를 저장할 딕셔너리 >>>
-    all_results = {}
+    # 수집과 계산이 겹치므로 버퍼 두 개를 번갈아 사용합니다.
+    buffers = [(c_double * N_SAMPLES)(), (c_double * N_SAMPLES)()]
+    futures = []
 
     try:
-        # <<< 수정된 부분: 설정된 전압 목록을 순회하는 루프 >>>
-        for vin in W1_VOLTAGES:
-            measured_resistances = []
-            print(f"\n----- Measuring with Vin = {vin:.3f}V -----")
-
-            # 1. W1 (파형 발생기) 설정
-            dwf.FDwfAnalogOutNodeEnableSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_bool(True))
-            dwf.FDwfAnalogOutNodeFunctionSet(hdwf, c_int(0), AnalogOutNodeCarrier, funcDC)
-            dwf.FDwfAnalogOutNodeOffsetSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(vin))
-            dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(True))
-            time.sleep(0.5)
-
-            # 2. 스코프 채널 1 (1+, 1-) 설정
-            dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(0), c_bool(True))
-            # 측정 범위를 입력 전압보다 약간 큰 값으로 설정
-            dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(0), c_double(vin + 1.0))
-            dwf.FDwfAnalogInConfigure(hdwf, c_bool(False), c_bool(False))
-            time.sleep(0.5)
-
-            # 3. N번 샘플링하며 저항 값 계산
-            for i in range(N_SAMPLES):
-                dwf.FDwfAnalogInStatus(hdwf, c_bool(False), None)
-                v_scope = c_double()
-                dwf.FDwfAnalogInStatusSample(hdwf, c_int(0), byref(v_scope))
-                v_out = v_scope.value
-                
-                if vin > v_out and v_out > 0:
-                    resistance = R_REF * (v_out / (vin - v_out))
-                    measured_resistances.append(resistance)
-                    print(f"\rSample [{i+1:03d}/{N_SAMPLES}] -> R: {resistance:,.2f} Ω", end="")
-            
-            # <<< 수정된 부분: 현재 전압의 측정 결과를 딕셔너리에 저장 >>>
-            all_results[vin] = measured_resistances
-            print("\nMeasurement for this voltage is complete.")
+        with open_device() as hdwf, ThreadPoolExecutor(max_workers=2) as executor:
+            # <<< 수정된 부분: 설정된 전압 목록을 순회하는 루프 >>>
+            for k, vin in enumerate(W1_VOLTAGES):
+                print(f"\n----- Measuring with Vin = {vin:.3f}V -----")
+                buffer = buffers[k % 2]
+                # 같은 버퍼를 쓰던 두 단계 전 계산이 끝난 뒤에 덮어씁니다.
+                if k >= 2:
+                    futures[k - 2][1].result()
+
+                acquire_vout(hdwf, vin, buffer)
+                v_out = np.frombuffer(buffer, dtype=np.float64)
+                futures.append((vin, executor.submit(compute_resistances, vin, v_out)))
+
+            # <<< 수정된 부분: 모든 측정 결과를 저장할 딕셔너리 >>>
+            # 결과 출력은 작업 스레드가 아니라 여기서 하여 측정 헤더와 섞이지 않게 합니다.
+            all_results = {}
+            print()
+            for vin, future in futures:
+                all_results[vin] = future.result()
+                print(f"Vin = {vin:.3f}V: {all_results[vin].size}/{N_SAMPLES} valid samples processed.")
         
         return all_results
 
+    except RuntimeError as e:
+        print(e)
+        return None
     except KeyboardInterrupt:
         print("\nMeasurement stopped by user.")
         return None
-    finally:
-        dwf.FDwfDeviceCloseAll()
-        print("\nDevice closed.")
 
 def plot_histograms_subplot(all_data):
     """
@@ -111,14 +129,14 @@ def plot_histograms_subplot(all_data):
 
     # axes.flatten()을 사용하여 2D 그리드를 1D로 만들어 쉽게 순회
     for ax, (vin, data) in zip(axes.flatten(), all_data.items()):
-        if not data: continue
+        if len(data) == 0: continue
 
         data_array = np.array(data)
         mean = np.mean(data_array)
         std_dev = np.std(data_array, ddof=1)
 
         # 각 서브플롯에 히스토그램 그리기
-        ax.hist(data_array, bins='auto', alpha=0.75, label='Resistance Distribution')
+        ax.hist(data_array, bins=HIST_BINS, alpha=0.75, label='Resistance Distribution')
         ax.axvline(mean, color='r', linestyle='dashed', linewidth=2, label=f'Mean: {mean:,.2f} Ω')
         
         # 각 서브플롯의 타이틀과 라벨 설정
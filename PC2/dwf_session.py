@@ -0,0 +1,70 @@
+#region: ------------------------- Import Libraries -------------------------
+import sys
+import time
+from contextlib import contextmanager
+from ctypes import *
+import numpy as np
+#endregion
+
+#region: ------------------------- DWF Library Setup ------------------------
+try:
+    if sys.platform.startswith("win"):
+        dwf = cdll.dwf
+    elif sys.platform.startswith("darwin"):
+        dwf = cdll.LoadLibrary("/Library/Frameworks/dwf.framework/dwf")
+    else:
+        dwf = cdll.LoadLibrary("libdwf.so")
+except OSError:
+    print("DWF library not found. Please install WaveForms.")
+    quit()
+#endregion
+
+#region: ------------------------- Device Session ---------------------------
+@contextmanager
+def open_device():
+    """
+    첫 번째 장치를 열고 핸들(hdwf)을 넘겨줍니다. with 블록이 끝나면 장치를 닫습니다.
+    장치를 열 수 없으면 RuntimeError를 발생시킵니다.
+
+    사용 예:
+        with open_device() as hdwf:
+            dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(True))
+    """
+    hdwf = c_int()
+    print("Opening first device...")
+    if dwf.FDwfDeviceOpen(c_int(-1), byref(hdwf)) == 0:
+        szerr = create_string_buffer(512)
+        dwf.FDwfGetLastErrorMsg(szerr)
+        raise RuntimeError(f"Failed to open device: {szerr.value.decode(errors='replace')}")
+
+    try:
+        yield hdwf
+    finally:
+        dwf.FDwfDeviceClose(hdwf)
+        print("Device closed.")
+
+def wait_settled(hdwf, channel=0, tol=5e-4, max_wait=0.5, n_points=8):
+    """
+    스코프 채널 전압이 안정될 때까지 기다립니다. (고정된 time.sleep 대체)
+    n_points 개를 연속으로 읽어 표준편차가 tol 미만이고 직전 묶음과의 평균 차이도
+    tol 미만이면 안정된 것으로 봅니다. max_wait 초 안에 안정되면 True를 반환합니다.
+    스코프는 미리 FDwfAnalogInConfigure로 설정되어 있어야 합니다.
+    """
+    readings = np.empty(n_points)
+    v_reading = c_double()
+    previous_mean = None
+    deadline = time.perf_counter() + max_wait
+    while True:
+        for k in range(n_points):
+            dwf.FDwfAnalogInStatus(hdwf, c_bool(False), None)
+            dwf.FDwfAnalogInStatusSample(hdwf, c_int(channel), byref(v_reading))
+            readings[k] = v_reading.value
+
+        mean = readings.mean()
+        if readings.std() < tol and previous_mean is not None and abs(mean - previous_mean) < tol:
+            return True
+        if time.perf_counter() >= deadline:
+            return False
+        previous_mean = mean
+        time.sleep(0.01)
+#endregion
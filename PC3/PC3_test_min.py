@@ -6,6 +6,7 @@ from ctypes import *
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.optimize import curve_fit
+from tqdm import tqdm
 import csv
 
 try:
@@ -37,6 +38,10 @@ N_SAMPLES = MAX_BUFFER_SIZE
 # 3. 원하는 측정 시간(1주기)을 이 버퍼에 담을 수 있도록 샘플링 주파수를 계산합니다.
 # Sampling Freq = Total Samples / Total Time = N_SAMPLES / (1 / SQUARE_WAVE_FREQ_HZ)
 SAMPLING_FREQUENCY_HZ = N_SAMPLES * SQUARE_WAVE_FREQ_HZ
+
+# 4. 피팅에 쓰는 구간(전체의 1/4 ~ 1/2)만 장치에서 읽어옵니다.
+WINDOW_START = N_SAMPLES // 4
+WINDOW_LENGTH = N_SAMPLES // 4
 # ★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★
 
 print("--- 최종 설정값 ---")
@@ -49,6 +54,9 @@ print("--------------------")
 
 WAVEGEN_AMPLITUDE_V = 1.65
 WAVEGEN_OFFSET_V = 1.65
+
+MAX_PLOT_POINTS = 2000 # 그래프에 그릴 최대 점 개수
+PLOT_EACH_RUN = False  # True이면 반복 측정마다 같은 그래프 창을 갱신합니다.
 #endregion
 
 #region: ------------------------- DWF Library Setup ------------------------
@@ -66,117 +74,180 @@ hdwf = c_int()
 #endregion
 
 #region: ------------------------- Main Logic & Plotting --------------------
+def setup_rc(hdwf):
+    """파형 발생기, 오실로스코프, 트리거를 한 번만 설정합니다."""
+    # 1. 파형 발생기 설정
+    dwf.FDwfAnalogOutNodeEnableSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_bool(True))
+    dwf.FDwfAnalogOutNodeFunctionSet(hdwf, c_int(0), AnalogOutNodeCarrier, funcSquare)
+    dwf.FDwfAnalogOutNodeFrequencySet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(SQUARE_WAVE_FREQ_HZ))
+    dwf.FDwfAnalogOutNodeAmplitudeSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(WAVEGEN_AMPLITUDE_V))
+    dwf.FDwfAnalogOutNodeOffsetSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(WAVEGEN_OFFSET_V))
+    dwf.FDwfAnalogOutRepeatSet(hdwf, c_int(0), c_int(0))
+    dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(True))
+    time.sleep(0.5)
+
+    # 2. 오실로스코프 설정
+    dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(0), c_bool(True))
+    dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(1), c_bool(True))
+    dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(0), c_double(5.0))
+    dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(1), c_double(5.0))
+    dwf.FDwfAnalogInFrequencySet(hdwf, c_double(SAMPLING_FREQUENCY_HZ))
+    dwf.FDwfAnalogInBufferSizeSet(hdwf, c_int(N_SAMPLES))
+
+    # 3. 트리거 설정
+    dwf.FDwfAnalogInTriggerSourceSet(hdwf, trigsrcDetectorAnalogIn)
+    dwf.FDwfAnalogInTriggerChannelSet(hdwf, c_int(0))
+    dwf.FDwfAnalogInTriggerTypeSet(hdwf, trigtypeEdge)
+    dwf.FDwfAnalogInTriggerConditionSet(hdwf, DwfTriggerSlopeRise)
+    dwf.FDwfAnalogInTriggerLevelSet(hdwf, c_double(1.0))
+
+def make_rc_buffers():
+    """acquire_rc에서 재사용할 NumPy 버퍼 (V_source, V_C, V_R, I)를 만듭니다."""
+    v_source = np.empty(WINDOW_LENGTH, dtype=np.float64)
+    return v_source, np.empty_like(v_source), np.empty_like(v_source), np.empty_like(v_source)
+
+def acquire_rc(hdwf, bufs, axes=None):
+    """
+    이미 설정된 장치로 한 번 수집하고 피팅 결과를 반환합니다.
+    bufs는 make_rc_buffers()가 만든 배열들로, 호출 간에 재사용됩니다.
+    axes (ax1, ax2)를 넘기면 그 위에 결과를 그립니다.
+    """
+    v_source, v_capacitor, v_resistor, current_amperes = bufs
+
+    # 4. 데이터 수집
+    dwf.FDwfAnalogInConfigure(hdwf, c_bool(False), c_bool(True))
+
+    # 수집에 걸리는 시간만큼 한 번에 기다린 뒤, 끝날 때까지 짧게 확인합니다.
+    time.sleep(N_SAMPLES / SAMPLING_FREQUENCY_HZ * 0.95)
+    status = c_byte()
+    while True:
+        dwf.FDwfAnalogInStatus(hdwf, c_bool(True), byref(status))
+        if status.value == DwfStateDone.value:
+            break
+        time.sleep(0.001)
+
+    # 5. 데이터 읽기 및 처리 (피팅 구간만 NumPy 배열에 직접 받아 복사 없이 계산)
+    dwf.FDwfAnalogInStatusData2(hdwf, c_int(0), v_source.ctypes.data_as(POINTER(c_double)), c_int(WINDOW_START), c_int(WINDOW_LENGTH))
+    dwf.FDwfAnalogInStatusData2(hdwf, c_int(1), v_capacitor.ctypes.data_as(POINTER(c_double)), c_int(WINDOW_START), c_int(WINDOW_LENGTH))
+
+    np.subtract(v_source, v_capacitor, out=v_resistor)
+    np.divide(v_resistor, R_SENSE_OHMS, out=current_amperes)
+    # 시간 축은 실제 수집 구간 위치(WINDOW_START)부터 시작
+    time_seconds = (WINDOW_START + np.arange(WINDOW_LENGTH)) / SAMPLING_FREQUENCY_HZ
+    return plot_results(time_seconds, v_source, v_capacitor, current_amperes, axes)
+
 def measure_rc_circuit():
-    # ... (이하 로직은 이전과 동일하게 작동합니다) ...
-    # print("Opening first device...")
+    """장치를 열고 한 번 측정한 뒤 닫습니다. 반복 측정은 setup_rc/acquire_rc를 사용하세요."""
     if dwf.FDwfDeviceOpen(c_int(-1), byref(hdwf)) == 0:
         print("Failed to open device")
-        return
-
-    voltage_samples_ch1 = (c_double * N_SAMPLES)()
-    voltage_samples_ch2 = (c_double * N_SAMPLES)()
+        return None
 
+    bufs = make_rc_buffers()
     try:
-        # 1. 파형 발생기 설정
-        dwf.FDwfAnalogOutNodeEnableSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_bool(True))
-        dwf.FDwfAnalogOutNodeFunctionSet(hdwf, c_int(0), AnalogOutNodeCarrier, funcSquare)
-        dwf.FDwfAnalogOutNodeFrequencySet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(SQUARE_WAVE_FREQ_HZ))
-        dwf.FDwfAnalogOutNodeAmplitudeSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(WAVEGEN_AMPLITUDE_V))
-        dwf.FDwfAnalogOutNodeOffsetSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(WAVEGEN_OFFSET_V))
-        dwf.FDwfAnalogOutRepeatSet(hdwf, c_int(0), c_int(0))
-        dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(True))
-        time.sleep(0.5)
-
-        # 2. 오실로스코프 설정
-        dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(0), c_bool(True))
-        dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(1), c_bool(True))
-        dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(0), c_double(5.0))
-        dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(1), c_double(5.0))
-        dwf.FDwfAnalogInFrequencySet(hdwf, c_double(SAMPLING_FREQUENCY_HZ))
-        dwf.FDwfAnalogInBufferSizeSet(hdwf, c_int(N_SAMPLES))
-
-        # 3. 트리거 설정
-        dwf.FDwfAnalogInTriggerSourceSet(hdwf, trigsrcDetectorAnalogIn)
-        dwf.FDwfAnalogInTriggerChannelSet(hdwf, c_int(0))
-        dwf.FDwfAnalogInTriggerTypeSet(hdwf, trigtypeEdge)
-        dwf.FDwfAnalogInTriggerConditionSet(hdwf, DwfTriggerSlopeRise)
-        dwf.FDwfAnalogInTriggerLevelSet(hdwf, c_double(1.0))
-
-        # 4. 데이터 수집
-        # print("Starting acquisition...")
-        dwf.FDwfAnalogInConfigure(hdwf, c_bool(False), c_bool(True))
-        
-        status = c_byte()
-        while True:
-            dwf.FDwfAnalogInStatus(hdwf, c_bool(True), byref(status))
-            if status.value == DwfStateDone.value:
-                break
-            time.sleep(0.1)
-        
-        # print("Acquisition complete.")
-
-        # 5. 데이터 읽기 및 처리
-        dwf.FDwfAnalogInStatusData(hdwf, c_int(0), voltage_samples_ch1, N_SAMPLES)
-        dwf.FDwfAnalogInStatusData(hdwf, c_int(1), voltage_samples_ch2, N_SAMPLES)
-
-        v_source = np.frombuffer(voltage_samples_ch1, dtype=np.double)
-        v_capacitor = np.frombuffer(voltage_samples_ch2, dtype=np.double)
-        v_resistor = v_source - v_capacitor
-        current_amperes = v_resistor / R_SENSE_OHMS
-        time_seconds = np.arange(0, N_SAMPLES) / SAMPLING_FREQUENCY_HZ
-        total_len=len(time_seconds)
-        tmp=plot_results(time_seconds[total_len//4:total_len//2], v_source[total_len//4:total_len//2], v_capacitor[total_len//4:total_len//2], current_amperes[total_len//4:total_len//2])
-
+        setup_rc(hdwf)
+        return acquire_rc(hdwf, bufs)
     except KeyboardInterrupt:
         print("\nMeasurement stopped by user.")
+        return None
     finally:
         dwf.FDwfDeviceCloseAll()
-        # print("Device closed.")
-        return tmp
 
 def exp_decay(t, i, RC):
     return i * np.exp(-t / RC)
 
-def plot_results(t, v_source, v_cap, current):
-    # fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
-    for i in range(len(v_source)-1):
-        if v_source[i]/v_source[i+1]>1.000005:
-            break
-    
-    params, covariance = curve_fit(exp_decay, t[i:], v_source[i:])
-    # plt.style.use('seaborn-v0_8-whitegrid')
-    # ax1.plot(t * 1000, v_source, label=f'Source Voltage ($V_{{source}}$)', color='blue')
-    # ax1.plot(t*1000,[exp_decay(i,params[0],params[1]) for i in t],label=f'Capacity={params[1]/R_SENSE_OHMS*10**6:.2f}mu',ls='--')
-    # ax1.plot(t * 1000, v_cap, label=f'Capacitor Voltage ($V_C$)', color='red')
-    # ax1.set_title('RC Circuit Voltage and Current Measurement (Full Cycle)', fontsize=16)
-    # ax1.set_ylabel('Voltage (V)', fontsize=12)
-    # ax1.legend()
-    # ax1.grid(True)
-    # ax2.plot(t * 1000, current * 1000, label='Circuit Current (I)', color='green')
-    # ax2.set_xlabel('Time (ms)', fontsize=12)
-    # ax2.set_ylabel('Current (mA)', fontsize=12)
-    # ax2.legend()
-    # ax2.grid(True)
-    # plt.tight_layout()
-    # plt.show()
+def exp_decay_jac(t, i, RC):
+    # exp_decay의 (i, RC)에 대한 편미분. curve_fit의 수치 미분을 대신합니다.
+    e = np.exp(-t / RC)
+    return np.column_stack([e, i * t * e / RC**2])
+
+def plot_results(t, v_source, v_cap, current, axes=None):
+    # 감쇠가 시작되는 지점(연속 샘플 비가 처음으로 1.000005를 넘는 곳)을 한 번에 찾습니다.
+    ratio = v_source[:-1] / np.maximum(v_source[1:], 1e-12)
+    above = ratio > 1.000005
+    i = int(np.argmax(above)) if above.any() else 0
+
+    # 시작 시각을 0으로 옮겨서 피팅 조건을 좋게 만듭니다.
+    params, covariance = curve_fit(exp_decay, t[i:] - t[i], v_source[i:],
+                                   p0=[v_source[i], TAU], jac=exp_decay_jac, maxfev=200)
+    if axes is not None:
+        draw_results(axes, t, v_source, v_cap, current, i, params)
     return params
 
+def draw_results(axes, t, v_source, v_cap, current, i, params):
+    """
+    미리 만든 (ax1, ax2)에 측정 결과를 그립니다.
+    처음에만 선을 만들고 이후에는 set_data로 데이터만 바꿔서, 반복 측정 중에
+    Figure/Axes를 새로 만드는 비용을 없앱니다.
+    """
+    ax1, ax2 = axes
+    idx = np.linspace(0, len(t) - 1, min(len(t), MAX_PLOT_POINTS)).astype(int)
+    fit_idx = idx[idx >= i] # 피팅 곡선도 감쇠 시작점 이후의 솎아낸 점에서만 계산
+    fit_curve = exp_decay(t[fit_idx] - t[i], *params)
+    t_ms = t * 1000
+    fit_label = f'Capacity={params[1]/R_SENSE_OHMS*10**6:.2f}mu'
+
+    if not ax1.lines:
+        ax1.plot(t_ms[idx], v_source[idx], label=f'Source Voltage ($V_{{source}}$)', color='blue')
+        ax1.plot(t_ms[fit_idx], fit_curve, label=fit_label, ls='--')
+        ax1.plot(t_ms[idx], v_cap[idx], label=f'Capacitor Voltage ($V_C$)', color='red')
+        ax1.set_title('RC Circuit Voltage and Current Measurement', fontsize=16)
+        ax1.set_ylabel('Voltage (V)', fontsize=12)
+        ax1.grid(True)
+        ax2.plot(t_ms[idx], current[idx] * 1000, label='Circuit Current (I)', color='green')
+        ax2.set_xlabel('Time (ms)', fontsize=12)
+        ax2.set_ylabel('Current (mA)', fontsize=12)
+        ax2.legend()
+        ax2.grid(True)
+        ax1.figure.tight_layout()
+    else:
+        source_line, fit_line, cap_line = ax1.lines
+        source_line.set_data(t_ms[idx], v_source[idx])
+        fit_line.set_data(t_ms[fit_idx], fit_curve)
+        fit_line.set_label(fit_label)
+        cap_line.set_data(t_ms[idx], v_cap[idx])
+        ax2.lines[0].set_data(t_ms[idx], current[idx] * 1000)
+        for ax in axes:
+            ax.relim()
+            ax.autoscale_view()
+    ax1.legend()
+
+    ax1.figure.canvas.draw_idle()
+    ax1.figure.canvas.flush_events()
+
 if __name__ == '__main__':
-    temp=measure_rc_circuit()
+    # 장치 열기와 설정은 한 번만 하고, 201번의 측정은 수집만 반복합니다.
+    if dwf.FDwfDeviceOpen(c_int(-1), byref(hdwf)) == 0:
+        print("Failed to open device")
+        quit()
+
+    bufs = make_rc_buffers()
+    axes = None
+    if PLOT_EACH_RUN:
+        # Figure는 한 번만 만들고 매 측정마다 내용만 갱신합니다.
+        plt.style.use('seaborn-v0_8-whitegrid')
+        plt.ion()
+        fig, axes = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
+        plt.show()
+
     data=[]
-    data.append((temp[1]/R_SENSE_OHMS*10**6)/10-1)
-    for i in range(200):
-        print(f'{i}/200')
-        temp=measure_rc_circuit()
-        data.append((temp[1]/R_SENSE_OHMS*10**6)/10-1)
+    try:
+        setup_rc(hdwf)
+        for k in tqdm(range(201)):
+            params = acquire_rc(hdwf, bufs, axes)
+            data.append((params[1]/R_SENSE_OHMS*10**6)/10-1)
+    except KeyboardInterrupt:
+        print("\nMeasurement stopped by user.")
+    finally:
+        dwf.FDwfDeviceCloseAll()
     print(data)
     filename = "data.csv"
-    with open(filename, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        for i in range(len(data)):
-            writer.writerow([data[i]])
-            
-        
+    with open(filename, mode='w', newline='', buffering=1 << 16) as file:
+        csv.writer(file).writerows([[x] for x in data])
+
+    if PLOT_EACH_RUN:
+        plt.ioff()
+        plt.show()
+
     # plt.hist(data)
     # plt.show()
     
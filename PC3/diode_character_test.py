@@ -27,6 +27,9 @@ SWEEP_TIME = 5.0 # 스윕에 걸리는 시간 (초)
 # 스코프 설정
 SAMPLING_FREQ = 10000.0 # 샘플링 주파수 (Hz)
 BUFFER_SIZE = int(SAMPLING_FREQ * SWEEP_TIME) # 버퍼 크기
+
+# 그래프 설정
+MAX_PLOT_POINTS = 2000 # 그래프에 그릴 최대 점 개수 (곡선이 매끄러워 이 정도면 충분)
 #endregion
 
 #region: ------------------------- DWF Library Setup ------------------------
@@ -46,7 +49,7 @@ sts = c_byte()
 #region: ------------------------- Main Logic -------------------------------
 def measure_led_iv_curve():
     """
-    전압을 스윕하며 LED의 전압과 전류를 측정하여 I-V 데이터를 반환합니다.
+    전압을 스윕하며 LED의 전압(V)과 전류(mA)를 측정하여 I-V 데이터를 반환합니다.
     """
     print("Opening first device...")
     if dwf.FDwfDeviceOpen(c_int(-1), byref(hdwf)) == 0:
@@ -82,31 +85,31 @@ def measure_led_iv_curve():
         dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(True))
         time.sleep(0.1)
         dwf.FDwfAnalogInConfigure(hdwf, c_bool(True), c_bool(True))
-        
+
+        # 수집에 걸리는 시간만큼 한 번에 기다린 뒤, 끝날 때까지 짧게 확인합니다.
+        time.sleep(BUFFER_SIZE / SAMPLING_FREQ * 0.95)
         while True:
             dwf.FDwfAnalogInStatus(hdwf, c_int(1), byref(sts))
             if sts.value == stsDone.value:
                 break
-            time.sleep(0.1)
+            time.sleep(0.001)
 
         print("Measurement complete. Acquiring data...")
 
-        # 4. 데이터 수집
-        buffer_ch1 = (c_double * BUFFER_SIZE)() # V_led
-        buffer_ch2 = (c_double * BUFFER_SIZE)() # V_in
-        dwf.FDwfAnalogInStatusData(hdwf, c_int(0), buffer_ch1, BUFFER_SIZE)
-        dwf.FDwfAnalogInStatusData(hdwf, c_int(1), buffer_ch2, BUFFER_SIZE)
+        # 4. 데이터 수집 (NumPy 배열에 직접 받아 복사 없이 사용)
+        v_led = np.empty(BUFFER_SIZE, dtype=np.float64) # CH1
+        v_in = np.empty_like(v_led)                     # CH2
+        dwf.FDwfAnalogInStatusData(hdwf, c_int(0), v_led.ctypes.data_as(POINTER(c_double)), c_int(BUFFER_SIZE))
+        dwf.FDwfAnalogInStatusData(hdwf, c_int(1), v_in.ctypes.data_as(POINTER(c_double)), c_int(BUFFER_SIZE))
 
         # 5. 데이터 처리
-        v_led = np.frombuffer(buffer_ch1, dtype=np.float64)
-        v_in = np.frombuffer(buffer_ch2, dtype=np.float64)
-
-        # 저항 양단 전압을 계산하고, 이를 이용해 전류 계산
-        v_resistor = v_in - v_led
-        i_led = v_resistor / R_LIMIT
+        # 저항 양단 전압으로부터 전류(mA)를 한 배열 안에서 계산 (/R_LIMIT, *1000을 한 번에)
+        i_led_mA = np.empty_like(v_led)
+        np.subtract(v_in, v_led, out=i_led_mA)
+        i_led_mA *= 1000.0 / R_LIMIT
 
-        # 노이즈가 심한 초기/종료 부분 데이터 일부 제거
-        return v_led[100:-100], i_led[100:-100]
+        # 노이즈가 심한 초기/종료 부분 데이터 일부 제거 (복사 없는 슬라이스)
+        return v_led[100:-100], i_led_mA[100:-100]
 
     except KeyboardInterrupt:
         print("\nMeasurement stopped by user.")
@@ -116,19 +119,19 @@ def measure_led_iv_curve():
         dwf.FDwfDeviceCloseAll()
         print("Device closed.")
 
-def plot_iv_curve(v_led, i_led, led_color="Red"):
+def plot_iv_curve(v_led, i_led_mA, led_color="Red"):
     """
-    측정된 전압, 전류 데이터를 받아 I-V 커브 그래프를 그립니다.
+    측정된 전압(V), 전류(mA) 데이터를 받아 I-V 커브 그래프를 그립니다.
     """
-    if v_led is None or i_led is None:
+    if v_led is None or i_led_mA is None:
         print("No data to plot.")
         return
 
-    # 전류 단위를 mA로 변환
-    i_led_mA = i_led * 1000
+    # 수만 개의 점을 모두 그리지 않도록 균일한 간격으로 솎아냅니다.
+    idx = np.linspace(0, len(v_led) - 1, min(len(v_led), MAX_PLOT_POINTS)).astype(int)
 
     plt.figure(figsize=(10, 6))
-    plt.plot(v_led, i_led_mA, 'o-', markersize=2, label=f'{led_color} LED Measured Data')
+    plt.plot(v_led[idx], i_led_mA[idx], 'o-', markersize=2, label=f'{led_color} LED Measured Data')
     
     # <<< 수정된 부분: 문턱 전압 시각화 코드를 제거했습니다.
 
@@ -20,7 +20,9 @@ except ImportError:
 # 포화 영역을 확인하기 위해 -2.5V ~ +2.5V 범위를 스윕합니다.
 VIN_START = -2.5
 VIN_END = 2.5
-SWEEP_STEPS = 101
+# 선형 영역(출력이 포화되지 않는 Vin 범위)은 촘촘하게, 포화 영역은 양쪽에서 듬성듬성 스윕합니다.
+LINEAR_STEPS = 71      # 선형 영역 설정점 개수 (양 끝 포함)
+SATURATION_STEPS = 5   # 포화 영역 한쪽당 설정점 개수
 
 # LM324N에 공급할 전압
 V_POSITIVE_SUPPLY = 5.0  # Vcc (Pin 4)
@@ -35,6 +37,17 @@ OUTPUT_SATURATION_NEG = V_NEGATIVE_SUPPLY + 1.5
 
 # 노이즈 감소를 위해 각 스텝에서 평균 낼 샘플의 수
 SAMPLES_TO_AVERAGE = 1000
+# 스코프 샘플링 주파수 (Hz)
+SAMPLING_FREQ = 100000.0
+
+# True이면 W1을 하드웨어 램프로 한 번에 스윕하며 연속 수집하고,
+# False이면 스텝마다 DC 전압을 설정하고 수집합니다.
+USE_HARDWARE_RAMP = True
+RAMP_TIME = 1.0      # 램프 한 주기(전체 스윕)에 걸리는 시간 (s)
+RAMP_SAMPLES = 8192  # 램프 동안 채널마다 수집할 샘플 수 (장치 버퍼 크기 이내)
+
+# 스텝 스윕에서 진행 상황을 몇 스텝마다 한 번씩 출력할지
+PROGRESS_EVERY = 10
 #endregion
 
 #region: ------------------------- DWF Library Setup ------------------------
@@ -54,13 +67,169 @@ hdwf = c_int()
 #endregion
 
 #region: ------------------------- Main Logic -------------------------------
+def make_vin_setpoints():
+    """
+    VIN_START ~ VIN_END 스윕 설정점을 만듭니다. 출력이 평평한 포화 영역은 SATURATION_STEPS 개로
+    듬성듬성, 이론상 선형 영역(포화 전압 / 이득)은 LINEAR_STEPS 개로 촘촘하게 배치합니다.
+    """
+    vin_linear_neg = OUTPUT_SATURATION_NEG / THEORETICAL_GAIN
+    vin_linear_pos = OUTPUT_SATURATION_POS / THEORETICAL_GAIN
+    return np.concatenate([
+        np.linspace(VIN_START, vin_linear_neg, SATURATION_STEPS, endpoint=False),
+        np.linspace(vin_linear_neg, vin_linear_pos, LINEAR_STEPS),
+        np.linspace(VIN_END, vin_linear_pos, SATURATION_STEPS, endpoint=False)[::-1],
+    ])
+
+def sweep_with_steps(vin_setpoints):
+    """
+    W1에 설정점마다 DC 전압을 출력하고 그때마다 Ch1/Ch2를 수집해 평균을 냅니다.
+    모든 스텝의 샘플을 (스텝, 샘플) 2차원 배열에 모았다가 스윕이 끝난 뒤 한 번에 평균합니다.
+    (vin_data, vout_data)를 반환합니다.
+    """
+    n_steps = len(vin_setpoints)
+
+    print("Configuring Waveform Generator W1 (as Vin)...")
+    # W1 (Vin 스윕용)
+    dwf.FDwfAnalogOutNodeEnableSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_bool(True))
+    dwf.FDwfAnalogOutNodeFunctionSet(hdwf, c_int(0), AnalogOutNodeCarrier, funcDC)
+    # 첫 설정점으로 W1을 한 번만 시작하고, 이후에는 오프셋만 바꿔서 반영
+    dwf.FDwfAnalogOutNodeOffsetSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(vin_setpoints[0]))
+    dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(True))
+
+    # 샘플링 설정
+    # 한 번의 수집으로 SAMPLES_TO_AVERAGE 개를 장치 버퍼에 받는 Single 모드
+    dwf.FDwfAnalogInAcquisitionModeSet(hdwf, acqmodeSingle)
+    dwf.FDwfAnalogInFrequencySet(hdwf, c_double(SAMPLING_FREQ))
+    dwf.FDwfAnalogInBufferSizeSet(hdwf, c_int(SAMPLES_TO_AVERAGE))
+    # 위 설정을 장치에 한 번 반영 (수집은 시작하지 않음). 스텝마다는 수집 시작만 합니다.
+    dwf.FDwfAnalogInConfigure(hdwf, c_bool(True), c_bool(False))
+
+    # 모든 스텝의 샘플을 담을 배열 (각 행에 장치 데이터를 직접 받음)
+    all_vin = np.empty((n_steps, SAMPLES_TO_AVERAGE), dtype=np.float64)
+    all_vout = np.empty_like(all_vin)
+
+    # 상태 확인 간격: 한 번 수집 시간(10 ms)의 1/10만큼만 쉬면서 새 샘플을 확인
+    poll_interval = max(SAMPLES_TO_AVERAGE / SAMPLING_FREQ * 0.1, 0.0005)
+    sts = c_byte()
+    c_valid = c_int()
+    # 한 스텝 수집을 기다리는 최대 시간 (예상 수집 시간의 10배, 최소 1초)
+    acquisition_timeout = max(SAMPLES_TO_AVERAGE / SAMPLING_FREQ * 10, 1.0)
+
+    for i, v_in_setpoint in enumerate(vin_setpoints):
+        # W1(Vin)에 스윕 전압 설정 (3 = 재시작 없이 변경된 설정만 적용)
+        dwf.FDwfAnalogOutNodeOffsetSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(v_in_setpoint))
+        dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_int(3))
+        time.sleep(0.05) # 전압 안정화 대기
+
+        # 스코프 측정 시작
+        dwf.FDwfAnalogInConfigure(hdwf, c_bool(False), c_bool(True))
+
+        # 수집이 끝나기를 기다리지 않고, 새로 들어온 샘플만 i번째 행의 이어지는 위치에 바로 읽어옴
+        # Ch1 -> Vin, Ch2 -> Vout
+        # 수집이 끝나면(Done) 남은 샘플을 모두 읽고, acquisition_timeout 안에 끝나지 않으면 중단
+        n_read = 0
+        deadline = time.perf_counter() + acquisition_timeout
+        while n_read < SAMPLES_TO_AVERAGE:
+            dwf.FDwfAnalogInStatus(hdwf, c_bool(True), byref(sts))
+            if sts.value == DwfStateDone.value:
+                n_valid = SAMPLES_TO_AVERAGE
+            else:
+                dwf.FDwfAnalogInStatusSamplesValid(hdwf, byref(c_valid))
+                n_valid = min(c_valid.value, SAMPLES_TO_AVERAGE)
+            n_new = n_valid - n_read
+            if n_new <= 0:
+                if time.perf_counter() >= deadline:
+                    raise RuntimeError(f"Acquisition at Vin = {v_in_setpoint:+.2f}V did not finish "
+                                       f"({n_read}/{SAMPLES_TO_AVERAGE} samples read).")
+                time.sleep(poll_interval)
+                continue
+            dwf.FDwfAnalogInStatusData2(hdwf, c_int(0), all_vin[i, n_read:].ctypes.data_as(POINTER(c_double)), c_int(n_read), c_int(n_new))
+            dwf.FDwfAnalogInStatusData2(hdwf, c_int(1), all_vout[i, n_read:].ctypes.data_as(POINTER(c_double)), c_int(n_read), c_int(n_new))
+            n_read += n_new
+
+        # 디버깅을 위한 상세 정보 출력 (터미널 쓰기를 줄이기 위해 PROGRESS_EVERY 스텝마다)
+        if i % PROGRESS_EVERY == 0 or i == n_steps - 1:
+            print(f"\rVin_target: {v_in_setpoint:+.2f}V | Vin_actual: {all_vin[i].mean():+.3f}V"
+                  f" | Vout_actual: {all_vout[i].mean():+.3f}V [{i+1}/{n_steps}]", end="")
+
+    # 모든 스텝의 평균을 한 번에 계산
+    return all_vin.mean(axis=1), all_vout.mean(axis=1)
+
+def sweep_with_ramp(vin_setpoints):
+    """
+    W1이 VIN_START -> VIN_END 램프를 한 번 출력하는 동안 Ch1/Ch2를 한 번에 수집하고,
+    각 설정점 주변 구간의 평균으로 (vin_data, vout_data)를 반환합니다.
+    스텝마다의 전압 설정, 안정화 대기, 수집 왕복을 장치 안의 스윕 하나로 대체합니다.
+    """
+    print("Configuring Waveform Generator W1 (as Vin ramp)...")
+    # W1: 한 주기가 RAMP_TIME 인 상승 램프 (VIN_START ~ VIN_END)
+    dwf.FDwfAnalogOutNodeEnableSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_bool(True))
+    dwf.FDwfAnalogOutNodeFunctionSet(hdwf, c_int(0), AnalogOutNodeCarrier, funcRampUp)
+    dwf.FDwfAnalogOutNodeFrequencySet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(1.0 / RAMP_TIME))
+    dwf.FDwfAnalogOutNodeAmplitudeSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double((VIN_END - VIN_START) / 2))
+    dwf.FDwfAnalogOutNodeOffsetSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double((VIN_END + VIN_START) / 2))
+
+    # 스코프: W1이 시작되는 순간 트리거되어 램프 한 주기를 한 번에 수집
+    dwf.FDwfAnalogInAcquisitionModeSet(hdwf, acqmodeSingle)
+    dwf.FDwfAnalogInFrequencySet(hdwf, c_double(RAMP_SAMPLES / RAMP_TIME))
+    dwf.FDwfAnalogInBufferSizeSet(hdwf, c_int(RAMP_SAMPLES))
+    dwf.FDwfAnalogInTriggerSourceSet(hdwf, trigsrcAnalogOut1)
+    # 트리거 시점을 버퍼 맨 앞으로 (기본값은 버퍼 중앙)
+    dwf.FDwfAnalogInTriggerPositionSet(hdwf, c_double(0.5 * RAMP_TIME))
+
+    # 위 스코프 설정을 반영하며 먼저 대기(armed) 상태로 만든 뒤 램프를 시작합니다.
+    sts = c_byte()
+    # 각 단계를 기다리는 최대 시간 (램프 한 주기의 10배)
+    acquisition_timeout = RAMP_TIME * 10
+    dwf.FDwfAnalogInConfigure(hdwf, c_bool(True), c_bool(True))
+    # Armed를 거치지 않고 바로 Triggered/Done이 되는 경우도 대기 완료로 봅니다.
+    deadline = time.perf_counter() + acquisition_timeout
+    while True:
+        dwf.FDwfAnalogInStatus(hdwf, c_bool(False), byref(sts))
+        if sts.value in (DwfStateArmed.value, DwfStateTriggered.value, DwfStateDone.value): break
+        if time.perf_counter() >= deadline:
+            raise RuntimeError("Scope was not armed for the ramp sweep.")
+        time.sleep(0.001)
+    dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(True))
+
+    time.sleep(RAMP_TIME * 0.95)
+    deadline = time.perf_counter() + acquisition_timeout
+    while True:
+        dwf.FDwfAnalogInStatus(hdwf, c_bool(True), byref(sts))
+        if sts.value == DwfStateDone.value: break
+        if time.perf_counter() >= deadline:
+            raise RuntimeError("Ramp sweep acquisition did not finish (scope never triggered?).")
+        time.sleep(0.001)
+
+    samples_ch1 = np.empty(RAMP_SAMPLES, dtype=np.float64)
+    samples_ch2 = np.empty_like(samples_ch1)
+    dwf.FDwfAnalogInStatusData(hdwf, c_int(0), samples_ch1.ctypes.data_as(POINTER(c_double)), c_int(RAMP_SAMPLES))
+    dwf.FDwfAnalogInStatusData(hdwf, c_int(1), samples_ch2.ctypes.data_as(POINTER(c_double)), c_int(RAMP_SAMPLES))
+
+    # 실제로 측정된 Vin(Ch1)을 기준으로, 이웃한 설정점의 중간값을 구간 경계로 삼아 각 샘플을 구간에 배정합니다.
+    # (램프 시작 위상이나 트리거 위치와 상관없이 샘플이 올바른 설정점에 모입니다)
+    # 구간별 합을 한 번에 구한 뒤 샘플 수로 나누고, 샘플이 없는 구간은 NaN으로 둡니다.
+    n_steps = len(vin_setpoints)
+    edges = (vin_setpoints[:-1] + vin_setpoints[1:]) / 2
+    bins = np.digitize(samples_ch1, edges)
+    counts = np.bincount(bins, minlength=n_steps)
+    vin_sums = np.bincount(bins, weights=samples_ch1, minlength=n_steps)
+    vout_sums = np.bincount(bins, weights=samples_ch2, minlength=n_steps)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vin_data = np.where(counts > 0, vin_sums / counts, np.nan)
+        vout_data = np.where(counts > 0, vout_sums / counts, np.nan)
+
+    return vin_data, vout_data
+
 def get_amplifier_transfer_curve():
     """
     Op-Amp 증폭기의 전달 특성 곡선(Vout vs Vin)을 측정하고 그래프로 플롯합니다.
     """
     transfer_curve_data = None
-    vin_data = []
-    vout_data = []
+
+    # 스윕할 Vin 설정점과 그에 대한 이론 곡선 (포화 특성 적용)은 측정 전에 미리 계산
+    vin_setpoints = make_vin_setpoints()
+    theoretical_vout = np.clip(vin_setpoints * THEORETICAL_GAIN, OUTPUT_SATURATION_NEG, OUTPUT_SATURATION_POS)
 
     print("Opening first device...")
     if dwf.FDwfDeviceOpen(c_int(-1), byref(hdwf)) == 0:
@@ -70,6 +239,9 @@ def get_amplifier_transfer_curve():
         print(str(szerr.value))
         return
 
+    # 설정 함수(*Set)마다 장치로 바로 전송하지 않고, 모았다가 *Configure 호출 때 한 번에 반영
+    dwf.FDwfDeviceAutoConfigureSet(hdwf, c_int(0))
+
     try:
         # 1. Op-Amp 전원 공급 (V+, V-) 켜기
         print(f"Configuring Power Supplies: V+={V_POSITIVE_SUPPLY}V, V-={V_NEGATIVE_SUPPLY}V")
@@ -79,18 +251,15 @@ def get_amplifier_transfer_curve():
         # V- (White wire)
         dwf.FDwfAnalogIOChannelNodeSet(hdwf, c_int(1), c_int(0), c_double(True)) # Enable
         dwf.FDwfAnalogIOChannelNodeSet(hdwf, c_int(1), c_int(1), c_double(V_NEGATIVE_SUPPLY))
-        # 전원 공급 시작
+        # 전원 공급 시작 (두 레일 설정을 한 번에 반영)
         dwf.FDwfAnalogIOEnableSet(hdwf, c_bool(True))
+        dwf.FDwfAnalogIOConfigure(hdwf)
         print("Power supplies ON. Waiting 1 sec to stabilize...")
         time.sleep(1.0) # 전원이 안정화될 때까지 대기
 
-        # 2. 파형 발생기 W1(Vin) 설정
-        print("Configuring Waveform Generator W1 (as Vin)...")
-        # W1 (Vin 스윕용)
-        dwf.FDwfAnalogOutNodeEnableSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_bool(True))
-        dwf.FDwfAnalogOutNodeFunctionSet(hdwf, c_int(0), AnalogOutNodeCarrier, funcDC)
-        # W2는 사용하지 않음
+        # 2. 파형 발생기 W2는 사용하지 않음 (W1은 스윕 방식에 따라 설정)
         dwf.FDwfAnalogOutNodeEnableSet(hdwf, c_int(1), AnalogOutNodeCarrier, c_bool(False))
+        dwf.FDwfAnalogOutConfigure(hdwf, c_int(1), c_bool(False))
 
         # 3. 스코프 Ch1(Vin 측정), Ch2(Vout 측정) 설정
         print("Configuring Scope Channels...")
@@ -100,48 +269,16 @@ def get_amplifier_transfer_curve():
         # Ch 2 (Vout 실제 값 측정용)
         dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(1), c_bool(True))
         dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(1), c_double(5.0)) # Range +/- 5V
-        
-        # 샘플링 설정
-        dwf.FDwfAnalogInAcquisitionModeSet(hdwf, acqmodeRecord)
-        dwf.FDwfAnalogInFrequencySet(hdwf, c_double(100000))
-        dwf.FDwfAnalogInRecordLengthSet(hdwf, c_double(SAMPLES_TO_AVERAGE / 100000.0))
-        time.sleep(0.5)
-
-        # --- 루프: Vin을 스윕하며 데이터 수집 ---
-        print(f"--- Starting Vin sweep from {VIN_START}V to {VIN_END}V ---")
-        vin_setpoints = np.linspace(VIN_START, VIN_END, SWEEP_STEPS)
-        
-        for v_in_setpoint in vin_setpoints:
-            # W1(Vin)에 스윕 전압 설정
-            dwf.FDwfAnalogOutNodeOffsetSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(v_in_setpoint))
-            dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(True))
-            time.sleep(0.05) # 전압 안정화 대기
-
-            # 스코프 측정 시작 및 대기
-            dwf.FDwfAnalogInConfigure(hdwf, c_bool(False), c_bool(True))
-            while True:
-                sts = c_byte()
-                dwf.FDwfAnalogInStatus(hdwf, c_bool(True), byref(sts))
-                if sts.value == DwfStateDone.value: break
-                time.sleep(0.01)
-
-            # Ch1 버퍼 데이터 읽기 및 평균 계산 (Vin)
-            buffer_ch1 = (c_double * SAMPLES_TO_AVERAGE)()
-            dwf.FDwfAnalogInStatusData(hdwf, c_int(0), buffer_ch1, SAMPLES_TO_AVERAGE)
-            v_in_actual = np.mean(buffer_ch1)
-
-            # Ch2 버퍼 데이터 읽기 및 평균 계산 (Vout)
-            buffer_ch2 = (c_double * SAMPLES_TO_AVERAGE)()
-            dwf.FDwfAnalogInStatusData(hdwf, c_int(1), buffer_ch2, SAMPLES_TO_AVERAGE)
-            v_out_actual = np.mean(buffer_ch2)
-
-            # 디버깅을 위한 상세 정보 출력
-            print(f"\rVin_target: {v_in_setpoint:+.2f}V | Vin_actual: {v_in_actual:+.3f}V | Vout_actual: {v_out_actual:+.3f}V", end="")
-
-            vin_data.append(v_in_actual)
-            vout_data.append(v_out_actual)
-                
-        transfer_curve_data = (vin_data, vout_data)
+        # 두 채널 설정을 한 번에 반영 (수집은 시작하지 않음)
+        dwf.FDwfAnalogInConfigure(hdwf, c_bool(True), c_bool(False))
+
+        # --- Vin을 스윕하며 데이터 수집 ---
+        if USE_HARDWARE_RAMP:
+            print(f"--- Starting hardware ramp sweep from {VIN_START}V to {VIN_END}V ({RAMP_TIME} s) ---")
+            transfer_curve_data = sweep_with_ramp(vin_setpoints)
+        else:
+            print(f"--- Starting Vin sweep from {VIN_START}V to {VIN_END}V ---")
+            transfer_curve_data = sweep_with_steps(vin_setpoints)
         print("\n\nSweep finished for all Vin values.")
 
     except Exception as e:
@@ -150,6 +287,7 @@ def get_amplifier_transfer_curve():
         # 프로그램 종료 시 장치 리셋 및 연결 해제
         dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(False)) # W1 정지
         dwf.FDwfAnalogIOEnableSet(hdwf, c_bool(False)) # 전원 공급 정지
+        dwf.FDwfAnalogIOConfigure(hdwf)
         dwf.FDwfDeviceCloseAll()
         print("Power supplies OFF. Device closed.")
 
@@ -163,11 +301,7 @@ def get_amplifier_transfer_curve():
         plt.plot(vin, vout, marker='.', linestyle='-', label=f'Measured Vout vs Vin (G={THEORETICAL_GAIN:.1f})')
         
         # (2) 이론적인 이득 및 포화 곡선 플롯
-        theoretical_vin = np.linspace(VIN_START, VIN_END, SWEEP_STEPS)
-        theoretical_vout = theoretical_vin * THEORETICAL_GAIN
-        # LM324N의 포화 특성 적용
-        theoretical_vout = np.clip(theoretical_vout, OUTPUT_SATURATION_NEG, OUTPUT_SATURATION_POS)
-        plt.plot(theoretical_vin, theoretical_vout, 'r--', label=f'Theoretical G={THEORETICAL_GAIN:.1f} (with Saturation)')
+        plt.plot(vin_setpoints, theoretical_vout, 'r--', label=f'Theoretical G={THEORETICAL_GAIN:.1f} (with Saturation)')
 
         plt.title('LM324N Non-Inverting Amplifier Transfer Curve')
         plt.xlabel('Input Voltage (Vin) [V]')
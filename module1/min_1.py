@@ -1,5 +1,6 @@
 #region: ------------------------- Import Libraries -------------------------
 import sys
+import math
 from pathlib import Path
 import time
 from ctypes import *
@@ -12,6 +13,20 @@ try:
 except ImportError:
     print("dwfconstants.py not found. Make sure it's in the same directory.")
     quit()
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+    # Numba가 없으면 같은 함수를 순수 파이썬으로 실행합니다 (느리지만 결과는 동일).
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# 그래프 스타일은 모듈을 불러올 때 한 번만 적용
+plt.style.use('seaborn-v0_8-whitegrid')
 #endregion
 
 #region: ------------------------- Configuration ----------------------------
@@ -26,6 +41,14 @@ AC_FREQUENCY = 1000.0 # Hz
 # 오실로스코프 설정
 N_SAMPLES = 8192      # 한 번에 수집할 샘플 개수
 SAMPLING_FREQ = 200000.0 # 샘플링 주파수 (Hz)
+
+# True이면 AC_FREQUENCY 성분만의 RMS(Goertzel)로 저항을 계산하여 광대역 노이즈를 제거하고,
+# False이면 전체 대역 RMS를 사용합니다.
+MEASURE_FUNDAMENTAL_ONLY = True
+AC_BIN = round(AC_FREQUENCY / SAMPLING_FREQ * N_SAMPLES) # AC_FREQUENCY에 해당하는 DFT 빈 번호
+
+# 파형 그래프의 시간 축 (샘플 수와 길이가 정확히 같도록 linspace로 한 번만 생성)
+TIME_AXIS = np.linspace(0.0, (N_SAMPLES - 1) / SAMPLING_FREQ, N_SAMPLES)
 #endregion
 
 #region: ------------------------- DWF Library Setup ------------------------
@@ -41,9 +64,75 @@ except OSError:
     quit()
 
 hdwf = c_int()
+
+# plot_waveforms가 다시 그릴 때 재사용하는 Figure/Axes
+_FIG = None
+_AX = None
 #endregion
 
 #region: ------------------------- Main Logic -------------------------------
+@njit(cache=True, fastmath=True)
+def rms(x):
+    """제곱, 평균, 제곱근을 임시 배열 없이 한 번의 순회로 계산한 RMS(실효값)를 반환합니다."""
+    s = 0.0
+    for i in range(x.shape[0]):
+        s += x[i] * x[i]
+    return math.sqrt(s / x.shape[0])
+
+@njit('f8(f4[::1])', fastmath=True, boundscheck=False, cache=True)
+def rms_fixed(x):
+    """
+    길이가 N_SAMPLES로 고정된 float32 배열의 RMS. 반복 횟수가 컴파일 시점 상수라 루프가 완전히 벡터화됩니다.
+    시그니처를 지정했으므로 모듈을 불러올 때 바로 컴파일되어 첫 측정에서 지연이 없습니다.
+    """
+    s = 0.0
+    for i in range(N_SAMPLES):
+        s += x[i] * x[i]
+    return math.sqrt(s / N_SAMPLES)
+
+@njit('f8(f4[::1], i8)', fastmath=True, cache=True)
+def goertzel(x, k):
+    """
+    Goertzel 알고리즘으로 float32 배열 x의 k번째 DFT 빈 크기 |X[k]|를 한 번의 순회로 계산합니다.
+    기본 측정 경로(MEASURE_FUNDAMENTAL_ONLY)이므로 시그니처를 지정해 모듈을 불러올 때 미리 컴파일합니다.
+    """
+    n = x.shape[0]
+    coeff = 2.0 * math.cos(2.0 * math.pi * k / n)
+    s1 = 0.0
+    s2 = 0.0
+    for i in range(n):
+        s0 = x[i] + coeff * s1 - s2
+        s2 = s1
+        s1 = s0
+    return math.sqrt(max(s1 * s1 + s2 * s2 - coeff * s1 * s2, 0.0))
+
+if not HAVE_NUMBA:
+    # Numba가 없으면 위 커널은 순수 파이썬 루프가 되므로, 같은 계산을 NumPy 벡터 연산으로 대체합니다.
+    def rms(x):
+        """Numba가 없을 때: 제곱과 합을 einsum 한 번으로 계산해 임시 배열 없이 RMS를 반환합니다."""
+        return math.sqrt(np.einsum('i,i->', x, x, dtype=np.float64) / x.shape[0])
+    rms_fixed = rms
+
+    # AC_BIN 빈의 복소 지수 (측정마다 다시 만들지 않도록 한 번만 계산)
+    _AC_PHASOR = np.exp(-2j * np.pi * AC_BIN * np.arange(N_SAMPLES) / N_SAMPLES)
+
+    def goertzel(x, k):
+        """Numba가 없을 때: k번째 DFT 빈 크기 |X[k]|를 복소 지수와의 내적 한 번으로 계산합니다."""
+        n = x.shape[0]
+        if n == N_SAMPLES and k == AC_BIN:
+            phasor = _AC_PHASOR
+        else:
+            phasor = np.exp(-2j * np.pi * k * np.arange(n) / n)
+        return abs(np.dot(x, phasor))
+
+def channel_rms(x):
+    """설정에 따라 AC_FREQUENCY 성분의 RMS 또는 전체 대역 RMS를 반환합니다."""
+    if MEASURE_FUNDAMENTAL_ONLY:
+        # 빈 크기 -> 진폭 (2|X|/N) -> RMS (/sqrt(2))
+        return goertzel(x, AC_BIN) * math.sqrt(2.0) / x.shape[0]
+    if x.shape[0] == N_SAMPLES and x.dtype == np.float32:
+        return rms_fixed(x)
+    return rms(x)
 
 def measure_resistance():
     """
@@ -67,7 +156,15 @@ def measure_resistance():
         dwf.FDwfAnalogOutNodeFrequencySet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(AC_FREQUENCY))
         dwf.FDwfAnalogOutNodeAmplitudeSet(hdwf, c_int(0), AnalogOutNodeCarrier, c_double(AC_AMPLITUDE))
         dwf.FDwfAnalogOutConfigure(hdwf, c_int(0), c_bool(True))
-        time.sleep(0.5)
+
+        # 고정 대기 대신 W1이 실제로 출력을 시작할 때까지 확인한 뒤, 몇 주기만 더 기다립니다.
+        sts = c_byte()
+        while True:
+            dwf.FDwfAnalogOutStatus(hdwf, c_int(0), byref(sts))
+            if sts.value == DwfStateRunning.value:
+                break
+            time.sleep(0.001)
+        time.sleep(5.0 / AC_FREQUENCY)
 
         # 2. 스코프 채널 1 & 2 설정
         print("Configuring Scope Channels...")
@@ -77,26 +174,24 @@ def measure_resistance():
         # 채널 2 (V_x) 활성화 및 범위 설정
         dwf.FDwfAnalogInChannelEnableSet(hdwf, c_int(1), c_bool(True))
         dwf.FDwfAnalogInChannelRangeSet(hdwf, c_int(1), c_double(5.0))
-        
-        # [수정] 트리거를 '없음'으로 설정하여 즉시 측정을 시작하도록 합니다.
-        dwf.FDwfAnalogInTriggerSourceSet(hdwf, trigsrcNone)
-        
+
+        # 트리거는 기본값(없음)이라 Configure 즉시 측정을 시작합니다.
         # 샘플링 주파수 및 버퍼 크기 설정
         dwf.FDwfAnalogInFrequencySet(hdwf, c_double(SAMPLING_FREQ))
         dwf.FDwfAnalogInAcquisitionModeSet(hdwf, acqmodeRecord)
         dwf.FDwfAnalogInRecordLengthSet(hdwf, c_int(N_SAMPLES))
-        time.sleep(0.1)
 
         # 3. 파형 데이터 동시 수집
         print(f"Collecting {N_SAMPLES} samples from each channel...")
         dwf.FDwfAnalogInConfigure(hdwf, c_bool(False), c_bool(True))
-        
+
+        # 상태 확인 간격: 예상 수집 시간의 1/10만큼만 쉬면서 완료를 확인
+        poll_interval = max(N_SAMPLES / SAMPLING_FREQ * 0.1, 0.0005)
         while True:
-            sts = c_byte()
             dwf.FDwfAnalogInStatus(hdwf, c_bool(True), byref(sts))
             if sts.value == DwfStateDone.value:
                 break
-            time.sleep(0.01)
+            time.sleep(poll_interval)
         
         # 각 채널에서 데이터 읽어오기
         dwf.FDwfAnalogInStatusData(hdwf, c_int(0), vin_samples, N_SAMPLES) # Ch1 -> V_in
@@ -104,12 +199,14 @@ def measure_resistance():
         print("Acquisition complete.")
 
         # 4. 저항 계산
-        vin_array = np.array(list(vin_samples))
-        vx_array = np.array(list(vx_samples))
+        # 스코프 ADC 분해능에는 float32로 충분하므로 한 번만 변환해 계산과 플롯에 그대로 사용
+        # (누적은 커널 안에서 float64로 하므로 정확도는 유지됩니다)
+        vin_array = np.frombuffer(vin_samples, dtype=np.float64).astype(np.float32)
+        vx_array = np.frombuffer(vx_samples, dtype=np.float64).astype(np.float32)
         
         # RMS(실효값) 계산
-        vin_rms = np.sqrt(np.mean(vin_array**2))
-        vx_rms = np.sqrt(np.mean(vx_array**2))
+        vin_rms = channel_rms(vin_array)
+        vx_rms = channel_rms(vx_array)
         
         # 전압 분배 법칙을 이용한 저항 계산
         # Rx = R_ref * (V_x / (V_in - V_x))
@@ -131,16 +228,21 @@ def measure_resistance():
         dwf.FDwfDeviceCloseAll()
         print("Device closed.")
 
-def plot_waveforms(vin_array, vx_array, r_x):
-    """측정된 V_in, V_x 파형과 계산된 저항값을 플롯합니다."""
-    plt.style.use('seaborn-v0_8-whitegrid')
-    fig, ax = plt.subplots(figsize=(12, 6))
-
-    # 시간 축 생성
-    time_axis = np.arange(0, N_SAMPLES / SAMPLING_FREQ, 1 / SAMPLING_FREQ)
+def plot_waveforms(vin_array, vx_array, r_x, ax=None):
+    """
+    측정된 V_in, V_x 파형과 계산된 저항값을 플롯합니다.
+    ax를 주지 않으면 처음 만든 Figure/Axes를 지우고 다시 그립니다.
+    (사용자가 창을 닫았으면 새 Figure를 만듭니다)
+    """
+    global _FIG, _AX
+    if ax is None:
+        if _FIG is None or not plt.fignum_exists(_FIG.number):
+            _FIG, _AX = plt.subplots(figsize=(12, 6))
+        ax = _AX
+    ax.cla()
 
-    ax.plot(time_axis, vin_array, label=f'$V_{{in}}$ (Scope Ch 1)')
-    ax.plot(time_axis, vx_array, label=f'$V_{{x}}$ (Scope Ch 2)')
+    ax.plot(TIME_AXIS, vin_array, label=f'$V_{{in}}$ (Scope Ch 1)')
+    ax.plot(TIME_AXIS, vx_array, label=f'$V_{{x}}$ (Scope Ch 2)')
     
     ax.set_title(f'AC Resistance Measurement Waveforms\nCalculated $R_x \\approx {r_x:.2f} \\,\\Omega$', fontsize=16)
     ax.set_xlabel('Time (s)', fontsize=12)
@@ -148,7 +250,7 @@ def plot_waveforms(vin_array, vx_array, r_x):
     ax.legend()
     ax.grid(True)
     
-    plt.tight_layout()
+    ax.figure.tight_layout()
     plt.show()
 
 